@@ -2,10 +2,9 @@
 Основной модуль Telegram бота для преобразования голосовых сообщений в текст.
 """
 
-import os
+import asyncio
 import logging
-import tempfile
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 from telegram import Update
 from telegram.ext import (
@@ -20,12 +19,17 @@ from config import (
     TELEGRAM_TOKEN,
     SPEECH_RECOGNITION_ENGINE,
     WHISPER_MODEL,
-    VOSK_MODEL_PATH,
-    TEMP_DIR,
+    RECOGNITION_WORKERS,
+    BATCH_MAX_SIZE,
+    BATCH_TIMEOUT_MS,
     LOG_LEVEL,
     LOG_FILE
 )
-from speech_recognition_engine import get_speech_recognition_engine
+from speech_recognition_engine import (
+    BatchedRecognizer,
+    decode_audio_bytes,
+    get_configured_speech_recognition_engine
+)
 # Импорт модуля для генерации протоколов
 from protocol_bot import integrate_protocol_bot
 
@@ -37,25 +41,30 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Инициализация движка распознавания речи
+# Инициализация движка распознавания речи (экземпляр общий с расширением протоколов)
 try:
-    if SPEECH_RECOGNITION_ENGINE.lower() == "whisper":
-        speech_engine = get_speech_recognition_engine(
-            "whisper", 
-            model_name=WHISPER_MODEL
-        )
-    elif SPEECH_RECOGNITION_ENGINE.lower() == "vosk":
-        speech_engine = get_speech_recognition_engine(
-            "vosk", 
-            model_path=VOSK_MODEL_PATH
-        )
-    else:
-        logger.error(f"Неизвестный движок распознавания речи: {SPEECH_RECOGNITION_ENGINE}")
-        raise ValueError(f"Неизвестный движок распознавания речи: {SPEECH_RECOGNITION_ENGINE}")
+    speech_engine = get_configured_speech_recognition_engine()
 except Exception as e:
     logger.error(f"Ошибка при инициализации движка распознавания речи: {e}")
     raise
 
+# Пул потоков для распознавания речи, чтобы не блокировать цикл событий.
+# Модель общая для всех потоков: faster-whisper (num_workers) и Vosk распознают
+# параллельно, а WhisperEngine сам сериализует обращения к модели.
+recognition_executor = ThreadPoolExecutor(
+    max_workers=RECOGNITION_WORKERS,
+    thread_name_prefix="speech-recognition"
+)
+
+# Голосовые сообщения, пришедшие почти одновременно, распознаются одним пакетом,
+# если движок это поддерживает; иначе параллельно в пуле потоков
+speech_recognizer = BatchedRecognizer(
+    speech_engine,
+    recognition_executor,
+    max_batch_size=BATCH_MAX_SIZE,
+    timeout=BATCH_TIMEOUT_MS / 1000
+)
+
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Обработчик команды /start."""
@@ -94,7 +103,7 @@ async def about_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         f"технологию распознавания речи {SPEECH_RECOGNITION_ENGINE.capitalize()}.\n\n"
         "🔧 *Технические детали:*\n"
         f"- Движок распознавания: {SPEECH_RECOGNITION_ENGINE.capitalize()}\n"
-        f"- Модель: {WHISPER_MODEL if SPEECH_RECOGNITION_ENGINE.lower() == 'whisper' else 'Стандартная'}\n"
+        f"- Модель: {WHISPER_MODEL if SPEECH_RECOGNITION_ENGINE.lower() in ('whisper', 'faster-whisper') else 'Стандартная'}\n"
         f"- Генерация протоколов: Ollama + LLaMA/Mistral\n\n"
         "📦 *Исходный код:*\n"
         "https://github.com/dedvassi/telegram_voice_to_text_bot",
@@ -115,19 +124,14 @@ async def handle_voice_message(update: Update, context: ContextTypes.DEFAULT_TYP
         voice = update.message.voice
         voice_file = await context.bot.get_file(voice.file_id)
         
-        # Создание временного файла для сохранения голосового сообщения
-        temp_dir = Path(TEMP_DIR)
-        os.makedirs(temp_dir, exist_ok=True)
+        # Скачивание голосового сообщения в память и декодирование без записи на диск
+        voice_data = await voice_file.download_as_bytearray()
+        logger.info(f"Голосовое сообщение загружено: {voice.file_id} ({len(voice_data)} байт)")
         
-        voice_ogg_path = temp_dir / f"{voice.file_id}.ogg"
-        
-        # Скачивание голосового сообщения
-        await voice_file.download_to_drive(voice_ogg_path)
-        
-        logger.info(f"Голосовое сообщение сохранено: {voice_ogg_path}")
+        audio = await decode_audio_bytes(voice_data)
         
         # Распознавание речи
-        recognized_text = speech_engine.recognize_speech(str(voice_ogg_path))
+        recognized_text = await speech_recognizer.submit(audio)
         
         # Отправка результата
         if recognized_text:
@@ -144,12 +148,6 @@ async def handle_voice_message(update: Update, context: ContextTypes.DEFAULT_TYP
         
         # Удаление сообщения о обработке
         await processing_message.delete()
-        
-        # Удаление временного файла
-        try:
-            os.remove(voice_ogg_path)
-        except Exception as e:
-            logger.warning(f"Не удалось удалить временный файл {voice_ogg_path}: {e}")
             
     except Exception as e:
         logger.error(f"Ошибка при обработке голосового сообщения: {e}")
@@ -174,8 +172,25 @@ def main() -> None:
         logger.error("Токен Telegram не найден. Пожалуйста, укажите его в .env файле.")
         return
     
+    # uvloop ускоряет цикл событий на Linux/macOS; на Windows он недоступен
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("Используется цикл событий uvloop")
+    except ImportError:
+        logger.info("uvloop не установлен, используется стандартный цикл событий asyncio")
+    
+    protocol_extension = None
+    
+    async def post_shutdown(application: Application) -> None:
+        # Останавливаем сборку пакетов распознавания, пока цикл событий еще работает
+        await speech_recognizer.close()
+        # Закрываем соединения с Ollama, открытые генератором протоколов
+        if protocol_extension is not None:
+            await protocol_extension.protocol_generator.aclose()
+    
     # Создание и настройка приложения
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+    application = Application.builder().token(TELEGRAM_TOKEN).post_shutdown(post_shutdown).build()
     
     # Регистрация обработчиков команд
     application.add_handler(CommandHandler("start", start_command))
@@ -188,7 +203,7 @@ def main() -> None:
     
     # Интеграция функции генерации протоколов
     try:
-        protocol_extension = integrate_protocol_bot(application, speech_engine)
+        protocol_extension = integrate_protocol_bot(application, speech_recognizer)
         logger.info("Функция генерации протоколов успешно интегрирована")
     except Exception as e:
         logger.error(f"Ошибка при интеграции функции генерации протоколов: {str(e)}")
@@ -12,18 +12,41 @@ load_dotenv()
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 
 # Настройки для распознавания речи
-# Выбор движка: "whisper" или "vosk"
-SPEECH_RECOGNITION_ENGINE = os.getenv("SPEECH_RECOGNITION_ENGINE", "whisper")
+# Выбор движка: "faster-whisper" (по умолчанию, CTranslate2 с int8), "whisper" или "vosk"
+SPEECH_RECOGNITION_ENGINE = os.getenv("SPEECH_RECOGNITION_ENGINE", "faster-whisper")
 
 # Настройки для Whisper
 WHISPER_MODEL = os.getenv("WHISPER_MODEL", "tiny")  # tiny, base, small, medium, large
+# Язык голосовых сообщений; пустое значение включает автоопределение языка
+WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE", "ru") or None
+# Точность весов модели: int8 (динамическая квантизация на CPU), fp16, fp32
+QUANTIZATION = os.getenv("QUANTIZATION", "int8")
+
+# Вырезание пауз (VAD) перед распознаванием Whisper
+VAD_FILTER = os.getenv("VAD_FILTER", "true").lower() in ("1", "true", "yes")
+VAD_MIN_SILENCE_MS = int(os.getenv("VAD_MIN_SILENCE_MS", "500"))
+
+# Настройки для faster-whisper (CTranslate2): потоков CPU на одно распознавание,
+# 0 - ядра поровну между RECOGNITION_WORKERS
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))
 
 # Настройки для Vosk
 VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", "model")
 
+# Количество потоков для параллельного распознавания речи
+RECOGNITION_WORKERS = int(os.getenv("RECOGNITION_WORKERS", "2"))
+
+# Пакетное распознавание (только openai-whisper): сообщения, пришедшие в пределах таймаута, обрабатываются вместе
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "8"))
+BATCH_TIMEOUT_MS = int(os.getenv("BATCH_TIMEOUT_MS", "50"))
+
 # Пути для временных файлов
 TEMP_DIR = os.getenv("TEMP_DIR", "temp")
 
+# Сохранение копий протоколов на диск (по умолчанию PDF отправляется из памяти)
+PROTOCOL_ARCHIVE = os.getenv("PROTOCOL_ARCHIVE", "false").lower() in ("1", "true", "yes")
+PROTOCOLS_DIR = os.getenv("PROTOCOLS_DIR", "protocols")
+
 # Настройки логирования
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 LOG_FILE = os.getenv("LOG_FILE", "bot.log")
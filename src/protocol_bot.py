@@ -5,8 +5,9 @@
 """
 
 import os
+import asyncio
 import logging
-from pathlib import Path
+import aiofiles.os
 from telegram import Update
 from telegram.ext import (
     CommandHandler, 
@@ -16,38 +17,72 @@ from telegram.ext import (
     ConversationHandler
 )
 
-from config import TEMP_DIR
-from speech_recognition_engine import SpeechRecognitionEngine
+from config import TEMP_DIR, PROTOCOLS_DIR, PROTOCOL_ARCHIVE
+from speech_recognition_engine import BatchedRecognizer, get_configured_speech_recognition_engine
 from protocol_generator import ProtocolGenerator
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-)
+# Логирование настраивается в точке входа (bot.py)
 logger = logging.getLogger(__name__)
 
 # Состояния для ConversationHandler
 WAITING_FOR_VOICE = 1
 
+# Минимальный интервал между обновлениями статуса генерации, в секундах
+PROGRESS_UPDATE_INTERVAL = 3
+
+# Максимальная длина текстового сообщения Telegram
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+def split_message(text, limit=TELEGRAM_MESSAGE_LIMIT):
+    """
+    Разбивает текст на части, которые Telegram примет одним сообщением.
+    По возможности разрез делается по переводу строки; переводы строк на стыке
+    частей отбрасываются, чтобы не получить пустое сообщение.
+    
+    Args:
+        text (str): Текст сообщения
+        limit (int): Максимальная длина одной части
+        
+    Returns:
+        list: Части сообщения
+    """
+    parts = []
+    text = text.lstrip("\n")
+    while len(text) > limit:
+        # Перевод строки сразу после limit символов тоже подходит: сам он отбрасывается
+        cut = text.rfind("\n", 0, limit + 1)
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut].rstrip("\n"))
+        text = text[cut:].lstrip("\n")
+    if text:
+        parts.append(text)
+    return parts
+
 class ProtocolBot:
     """Расширение бота для генерации протоколов встреч."""
     
-    def __init__(self, bot, speech_engine):
+    def __init__(self, bot, speech_recognizer=None):
         """
         Инициализация расширения для генерации протоколов.
         
         Args:
             bot: Экземпляр Telegram-бота
-            speech_engine: Экземпляр движка распознавания речи
+            speech_recognizer: Пакетный распознаватель речи, общий с основным ботом.
+                Если не передан, создается поверх движка из настроек
+                (фабрика возвращает уже загруженную модель).
         """
         self.bot = bot
-        self.speech_engine = speech_engine
+        if speech_recognizer is None:
+            speech_recognizer = BatchedRecognizer(get_configured_speech_recognition_engine())
+        self.speech_recognizer = speech_recognizer
         self.protocol_generator = ProtocolGenerator()
         
-        # Создание директорий для временных файлов и протоколов
+        # Создание директорий для временных файлов и архива протоколов
         os.makedirs(TEMP_DIR, exist_ok=True)
-        os.makedirs("protocols", exist_ok=True)
+        if PROTOCOL_ARCHIVE:
+            os.makedirs(PROTOCOLS_DIR, exist_ok=True)
         
         # Регистрация обработчиков
         self._register_handlers()
@@ -103,10 +138,7 @@ class ProtocolBot:
             voice = update.message.voice
             voice_file = await context.bot.get_file(voice.file_id)
             
-            # Создание временного файла для голосового сообщения
-            temp_dir = Path(TEMP_DIR)
-            temp_dir.mkdir(exist_ok=True)
-            
+            # Создание временного файла для голосового сообщения (директория создается в config.py)
             voice_path = os.path.join(TEMP_DIR, f"{voice.file_id}.ogg")
             await voice_file.download_to_drive(voice_path)
             logger.info(f"Голосовое сообщение сохранено: {voice_path}")
@@ -115,39 +147,58 @@ class ProtocolBot:
             status_message = await update.message.reply_text("Распознаю речь...")
             
             # Распознавание речи
-            transcription = self.speech_engine.recognize_speech(voice_path)
+            transcription = await self.speech_recognizer.submit(voice_path)
             
             # Обновление статуса
             await status_message.edit_text("Речь распознана. Генерирую протокол...")
             
+            loop = asyncio.get_running_loop()
+            last_progress_update = loop.time()
+            
+            async def report_progress(received):
+                # Telegram ограничивает частоту редактирования сообщений
+                nonlocal last_progress_update
+                if loop.time() - last_progress_update < PROGRESS_UPDATE_INTERVAL:
+                    return
+                last_progress_update = loop.time()
+                try:
+                    await status_message.edit_text(f"Генерирую протокол... получено символов: {received}")
+                except Exception as e:
+                    logger.debug(f"Не удалось обновить статус генерации: {e}")
+            
             # Генерация протокола
-            pdf_path, protocol_text = self.protocol_generator.process_voice_transcription(transcription)
+            document, filename, protocol_text = await self.protocol_generator.aprocess_voice_transcription(
+                transcription,
+                output_dir=PROTOCOLS_DIR if PROTOCOL_ARCHIVE else None,
+                on_progress=report_progress
+            )
             
-            if pdf_path and os.path.exists(pdf_path):
-                # Отправка PDF-файла
+            if document:
+                # Отправка PDF-файла прямо из памяти
                 await update.message.reply_document(
-                    document=open(pdf_path, 'rb'),
-                    filename=os.path.basename(pdf_path),
+                    document=document,
+                    filename=filename,
                     caption="Протокол встречи в формате PDF"
                 )
                 
-                # Отправка текста протокола
-                await update.message.reply_text(
-                    f"Расшифровка голосового сообщения:\n\n{transcription}\n\n"
-                    f"Структурированный протокол:\n\n{protocol_text[:3900]}..."
-                    if len(protocol_text) > 4000 else
+                # Отправка текста протокола; длинный текст делится на несколько сообщений
+                message = (
                     f"Расшифровка голосового сообщения:\n\n{transcription}\n\n"
                     f"Структурированный протокол:\n\n{protocol_text}"
                 )
+                for part in split_message(message):
+                    await update.message.reply_text(part)
             else:
                 await update.message.reply_text(
                     f"Произошла ошибка при создании протокола. "
                     f"Расшифровка голосового сообщения:\n\n{transcription}"
                 )
             
-            # Удаление временного файла
-            if os.path.exists(voice_path):
-                os.remove(voice_path)
+            # Удаление временного файла без блокировки цикла событий
+            try:
+                await aiofiles.os.remove(voice_path)
+            except FileNotFoundError:
+                pass
             
             return ConversationHandler.END
             
@@ -171,15 +222,15 @@ class ProtocolBot:
 
 
 # Функция для интеграции с основным ботом
-def integrate_protocol_bot(bot, speech_engine):
+def integrate_protocol_bot(bot, speech_recognizer=None):
     """
     Интегрирует функциональность генерации протоколов в основного бота.
     
     Args:
         bot: Экземпляр Telegram-бота
-        speech_engine: Экземпляр движка распознавания речи
+        speech_recognizer: Пакетный распознаватель речи (необязательно)
         
     Returns:
         ProtocolBot: Экземпляр расширения для генерации протоколов
     """
-    return ProtocolBot(bot, speech_engine)
+    return ProtocolBot(bot, speech_recognizer)
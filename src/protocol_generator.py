@@ -5,18 +5,141 @@
 
 import os
 import re
-import json
+import asyncio
+import functools
+import hashlib
 import logging
+import httpx
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
 from fpdf import FPDF
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
+# Логирование настраивается в точке входа (bot.py)
 logger = logging.getLogger(__name__)
 
+
+# Шаблон промпта для генерации протокола. Часть до места для расшифровки
+# становится неизменным системным сообщением, остаток дописывается к сообщению пользователя
+_PROMPT_TEMPLATE = """
+        Ты профессиональный секретарь, который создает структурированные протоколы встреч.
+        
+        Преобразуй следующую расшифровку голосового сообщения в формальный протокол встречи.
+        
+        Структура протокола должна включать:
+        1. Заголовок с датой и темой встречи
+        2. Список участников (если упоминаются)
+        3. Повестку встречи в виде списка вопросов
+        4. Основное содержание обсуждения
+        5. Принятые решения и ответственных лиц
+        6. Сроки выполнения (если упоминаются)
+        
+        Расшифровка голосового сообщения:
+        {transcription}
+        
+        Создай хорошо структурированный, профессиональный протокол на основе этой информации.
+        """
+_PROMPT_PREFIX, _, _PROMPT_SUFFIX = _PROMPT_TEMPLATE.partition("{transcription}")
+
+
+# Директории, уже созданные этим процессом: повторный makedirs не нужен
+_MKDIR_CACHE = set()
+
+
+def _ensure_dir(path):
+    """
+    Создает директорию, если она еще не создавалась в этом процессе.
+    
+    Args:
+        path (str | Path): Путь к директории
+    """
+    path = os.fspath(path)
+    if path not in _MKDIR_CACHE:
+        os.makedirs(path, exist_ok=True)
+        _MKDIR_CACHE.add(path)
+
+
+def _file_stamp():
+    """
+    Возвращает короткую метку времени для имени файла протокола.
+    
+    Returns:
+        str: Текущее время в миллисекундах в шестнадцатеричной записи
+    """
+    return f"{time.time_ns() // 1_000_000:x}"
+
+
+def _render_pdf_worker(generator_class, settings, protocol_text, output_path, cache_dir):
+    """
+    Создает PDF-файл протокола в дочернем процессе ProcessPoolExecutor.
+    
+    Args:
+        generator_class (type): Класс генератора (ProtocolGenerator или его наследник)
+        settings (dict): Переопределенные в экземпляре параметры верстки
+        protocol_text (str): Текст протокола
+        output_path (str): Путь для сохранения PDF-файла
+        cache_dir (str | Path): Директория кэша PDF (None - без кэша)
+        
+    Returns:
+        str: Путь к созданному файлу
+    """
+    # Верстка не обращается к Ollama, поэтому генератор создается без __init__
+    generator = generator_class.__new__(generator_class)
+    generator.__dict__.update(settings)
+    return generator.generate_pdf(protocol_text, output_path, cache_dir=cache_dir)
+
+
+@functools.lru_cache(maxsize=1)
+def _find_fonts():
+    """
+    Ищет шрифты LiberationSans в директории проекта, затем в системе (для Linux).
+    Результат кэшируется, чтобы не проверять пути при создании каждого PDF.
+    
+    Returns:
+        tuple | None: (путь_к_regular, путь_к_bold) или None, если шрифты не найдены
+    """
+    fonts_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fonts')
+    regular_font_path = os.path.join(fonts_dir, 'LiberationSans-Regular.ttf')
+    bold_font_path = os.path.join(fonts_dir, 'LiberationSans-Bold.ttf')
+    
+    if os.path.exists(regular_font_path) and os.path.exists(bold_font_path):
+        return regular_font_path, bold_font_path
+    
+    logger.warning(f"Шрифты не найдены в директории проекта: {fonts_dir}")
+    system_font_paths = {
+        "regular": [
+            "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+            "/usr/share/fonts/TTF/LiberationSans-Regular.ttf"
+        ],
+        "bold": [
+            "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+            "/usr/share/fonts/TTF/LiberationSans-Bold.ttf"
+        ]
+    }
+    
+    for system_path in system_font_paths["regular"]:
+        if os.path.exists(system_path):
+            regular_font_path = system_path
+            logger.info(f"Используется системный шрифт Regular: {regular_font_path}")
+            break
+    
+    for system_path in system_font_paths["bold"]:
+        if os.path.exists(system_path):
+            bold_font_path = system_path
+            logger.info(f"Используется системный шрифт Bold: {bold_font_path}")
+            break
+    
+    if not os.path.exists(regular_font_path) or not os.path.exists(bold_font_path):
+        return None
+    return regular_font_path, bold_font_path
+
+
 class ProtocolGenerator:
     """
     Класс для генерации протоколов встреч на основе расшифровки голосовых сообщений.
@@ -24,17 +147,62 @@ class ProtocolGenerator:
     и FPDF2 для создания PDF-документов с поддержкой кириллицы.
     """
     
-    def __init__(self, model_name="llama3", ollama_url="http://localhost:11434"):
+    # Разметка протокола за один проход по строке: заголовок (группы 1-2),
+    # пункт маркированного списка (группа 3) или пункт нумерованного списка
+    _markup_re = re.compile(r'(#{1,3}) (.*)|\s*(?:- (.*\S)|\d+\.\s+\S)')
+    
+    # Извлечение даты, темы и предложений для базового форматирования
+    _date_re = re.compile(r'\d{1,2}\s+\w+|\d{1,2}\.\d{1,2}\.\d{2,4}')
+    _topic_re = re.compile(
+        r'(встреч[а-я]+|совещани[а-я]+|обсуждени[а-я]+)\s+(?:по|о|об|с)\s+([^\.]+)',
+        re.IGNORECASE
+    )
+    _sentence_re = re.compile(r'[^.]+')
+    
+    # Размер шрифта и отступ после заголовка для каждого уровня
+    _HEADING_STYLES = {1: (16, 5), 2: (14, 3), 3: (13, 0)}
+    _TEXT_FONT = ("", 12)
+    
+    # Асинхронный клиент Ollama создается лениво, в цикле событий бота
+    _async_client = None
+    # Части промпта общие для всех экземпляров, включая созданные без __init__
+    _system_prompt = _PROMPT_PREFIX
+    _prompt_suffix = _PROMPT_SUFFIX
+    
+    # Число одновременных запросов к Ollama при пакетной генерации
+    MAX_CONCURRENT_GENERATIONS = 4
+    
+    # Параметры генерации Ollama: фиксированный контекст не вызывает перезагрузку модели
+    # между запросами, а ограничение длины ответа отсекает затянувшееся декодирование
+    NUM_CTX = 4096
+    NUM_PREDICT = 512
+    KEEP_ALIVE = "30m"
+    
+    # Версия верстки входит в ключ кэша PDF и должна меняться при изменении render_pdf
+    _PDF_LAYOUT_VERSION = b"1"
+    
+    # Атрибуты, влияющие на верстку: их значения в экземпляре передаются в рабочие процессы
+    _RENDER_SETTINGS = ("_markup_re", "_HEADING_STYLES", "_TEXT_FONT", "_PDF_LAYOUT_VERSION")
+    
+    def __init__(self, model_name="llama3:8b-instruct-q4_K_M", ollama_url="http://localhost:11434"):
         """
         Инициализация генератора протоколов.
         
         Args:
-            model_name (str): Название модели Ollama (llama3, mistral, etc.)
+            model_name (str): Название модели Ollama (по умолчанию квантованная llama3 Q4_K_M)
             ollama_url (str): URL для API Ollama
         """
         self.model_name = model_name
         self.ollama_url = ollama_url
-        self.prompt_template = self._load_prompt_template()
+        # Chat API позволяет Ollama переиспользовать KV-кэш общего системного промпта
+        self._chat_url = f"{ollama_url}/api/chat"
+        
+        # Общая сессия держит пул keep-alive соединений с Ollama между запросами
+        self._session = requests.Session()
+        self._session.headers["Connection"] = "keep-alive"
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
         
         # Проверка доступности Ollama
         try:
@@ -43,32 +211,76 @@ class ProtocolGenerator:
         except Exception as e:
             logger.warning(f"Ollama недоступен: {e}. Будет использоваться базовое форматирование.")
     
-    def _load_prompt_template(self):
+    def close(self):
+        """
+        Закрывает HTTP-сессию и освобождает соединения с Ollama.
+        Асинхронный клиент закрывается только в aclose, так как требует цикла событий.
+        """
+        # У генераторов, созданных без __init__ (моки, рабочие процессы), сессии нет
+        session = getattr(self, "_session", None)
+        if session is not None:
+            session.close()
+    
+    async def aclose(self):
+        """Закрывает асинхронный клиент Ollama и HTTP-сессию."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        self.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+    
+    def _build_payload(self, transcription, stream):
         """
-        Загружает шаблон промпта для генерации протокола.
+        Формирует тело запроса к Ollama для указанной расшифровки.
         
+        Args:
+            transcription (str): Расшифрованный текст голосового сообщения
+            stream (bool): Запрашивать ли потоковый ответ
+            
         Returns:
-            str: Шаблон промпта
+            dict: Тело запроса к chat API
         """
-        # Базовый шаблон промпта
-        return """
-        Ты профессиональный секретарь, который создает структурированные протоколы встреч.
-        
-        Преобразуй следующую расшифровку голосового сообщения в формальный протокол встречи.
-        
-        Структура протокола должна включать:
-        1. Заголовок с датой и темой встречи
-        2. Список участников (если упоминаются)
-        3. Повестку встречи в виде списка вопросов
-        4. Основное содержание обсуждения
-        5. Принятые решения и ответственных лиц
-        6. Сроки выполнения (если упоминаются)
-        
-        Расшифровка голосового сообщения:
-        {transcription}
+        return {
+            "model": self.model_name,
+            "messages": [
+                {"role": "system", "content": self._system_prompt},
+                {"role": "user", "content": transcription + self._prompt_suffix}
+            ],
+            "stream": stream,
+            # Модель остается загруженной в памяти между запросами
+            "keep_alive": self.KEEP_ALIVE,
+            "options": {
+                "num_ctx": self.NUM_CTX,
+                "num_predict": self.NUM_PREDICT,
+                "num_thread": os.cpu_count(),
+                # Ollama сама распределяет слои по доступным GPU
+                "num_gpu": -1
+            }
+        }
+    
+    @staticmethod
+    def _message_content(chunk):
+        """
+        Извлекает текст ответа модели из объекта ответа chat API.
         
-        Создай хорошо структурированный, профессиональный протокол на основе этой информации.
+        Args:
+            chunk (dict): Ответ или фрагмент потокового ответа Ollama
+            
+        Returns:
+            str: Текст сообщения модели
         """
+        return chunk.get("message", {}).get("content", "")
     
     def _check_ollama_availability(self):
         """
@@ -78,12 +290,12 @@ class ProtocolGenerator:
             Exception: Если Ollama недоступен
         """
         try:
-            response = requests.get(f"{self.ollama_url}/api/tags", timeout=2)
+            response = self._session.get(f"{self.ollama_url}/api/tags", timeout=2)
             if response.status_code != 200:
                 raise Exception(f"Ollama вернул код ошибки: {response.status_code}")
             
             # Проверка наличия нужной модели
-            models = response.json().get("models", [])
+            models = orjson.loads(response.content).get("models", [])
             model_names = [model.get("name") for model in models]
             
             if not model_names:
@@ -109,31 +321,151 @@ class ProtocolGenerator:
         """
         try:
             # Попытка использовать Ollama для генерации протокола
-            prompt = self.prompt_template.format(transcription=transcription)
-            
-            payload = {
-                "model": self.model_name,
-                "prompt": prompt,
-                "stream": False
-            }
+            payload = self._build_payload(transcription, stream=True)
             
-            response = requests.post(
-                f"{self.ollama_url}/api/generate",
+            # Ответ читается построчно (NDJSON), не дожидаясь конца генерации
+            with self._session.post(
+                self._chat_url,
                 json=payload,
-                timeout=60
-            )
+                stream=True,
+                timeout=(5, 600)
+            ) as response:
+                if response.status_code != 200:
+                    logger.warning(f"Ошибка Ollama API: {response.status_code}. Использую базовое форматирование.")
+                    return self._basic_protocol_formatting(transcription)
+                
+                parts = []
+                for raw in response.iter_lines(decode_unicode=False):
+                    if not raw:
+                        continue
+                    chunk = orjson.loads(raw)
+                    parts.append(self._message_content(chunk))
+                    if chunk.get("done"):
+                        break
             
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("response", "").strip()
-            else:
-                logger.warning(f"Ошибка Ollama API: {response.status_code}. Использую базовое форматирование.")
-                return self._basic_protocol_formatting(transcription)
+            return "".join(parts).strip()
                 
         except Exception as e:
             logger.warning(f"Ошибка при генерации протокола через Ollama: {e}. Использую базовое форматирование.")
             return self._basic_protocol_formatting(transcription)
     
+    async def agenerate_protocol_text(self, transcription, on_progress=None):
+        """
+        Асинхронная генерация текста протокола с потоковым получением ответа Ollama.
+        Не блокирует цикл событий бота на время генерации.
+        
+        Args:
+            transcription (str): Расшифрованный текст голосового сообщения
+            on_progress (callable): Корутина, вызываемая с числом полученных символов
+            
+        Returns:
+            str: Структурированный текст протокола
+        """
+        try:
+            payload = self._build_payload(transcription, stream=True)
+            
+            parts = []
+            received = 0
+            async with self._get_async_client().stream(
+                "POST",
+                self._chat_url,
+                json=payload
+            ) as response:
+                if response.status_code != 200:
+                    logger.warning(f"Ошибка Ollama API: {response.status_code}. Использую базовое форматирование.")
+                    return self._basic_protocol_formatting(transcription)
+                
+                # Ollama отдает ответ построчно в формате NDJSON, по строке на фрагмент
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = orjson.loads(line)
+                    text = self._message_content(chunk)
+                    parts.append(text)
+                    received += len(text)
+                    
+                    if on_progress is not None:
+                        await on_progress(received)
+                    if chunk.get("done"):
+                        break
+            
+            return "".join(parts).strip()
+            
+        except Exception as e:
+            logger.warning(f"Ошибка при генерации протокола через Ollama: {e}. Использую базовое форматирование.")
+            return self._basic_protocol_formatting(transcription)
+    
+    async def _agenerate_one(self, client, semaphore, transcription):
+        """
+        Генерирует текст одного протокола в рамках пакетной обработки.
+        
+        Args:
+            client (httpx.AsyncClient): Общий клиент пакета
+            semaphore (asyncio.Semaphore): Ограничитель числа одновременных запросов к Ollama
+            transcription (str): Расшифрованный текст голосового сообщения
+            
+        Returns:
+            str: Структурированный текст протокола
+        """
+        payload = self._build_payload(transcription, stream=False)
+        
+        try:
+            async with semaphore:
+                response = await client.post(self._chat_url, json=payload, timeout=600)
+            
+            if response.status_code == 200:
+                return self._message_content(orjson.loads(response.content)).strip()
+            logger.warning(f"Ошибка Ollama API: {response.status_code}. Использую базовое форматирование.")
+        except Exception as e:
+            logger.warning(f"Ошибка при генерации протокола через Ollama: {e}. Использую базовое форматирование.")
+        
+        return self._basic_protocol_formatting(transcription)
+    
+    async def agenerate_protocol_texts(self, transcriptions, max_concurrency=None):
+        """
+        Пакетная генерация текстов протоколов: запросы к Ollama выполняются параллельно,
+        чтобы сервер мог загружать модель несколькими генерациями одновременно.
+        
+        Args:
+            transcriptions (list[str]): Расшифровки голосовых сообщений
+            max_concurrency (int): Максимум одновременных запросов (по умолчанию MAX_CONCURRENT_GENERATIONS)
+            
+        Returns:
+            list[str]: Тексты протоколов в порядке входных расшифровок
+        """
+        concurrency = max_concurrency or self.MAX_CONCURRENT_GENERATIONS
+        semaphore = asyncio.Semaphore(concurrency)
+        limits = httpx.Limits(max_keepalive_connections=concurrency, max_connections=concurrency)
+        
+        async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(600, connect=5)) as client:
+            return await asyncio.gather(
+                *(self._agenerate_one(client, semaphore, t) for t in transcriptions)
+            )
+    
+    def generate_protocol_texts(self, transcriptions, max_concurrency=None):
+        """
+        Синхронная обертка над agenerate_protocol_texts для скриптов и тестов.
+        
+        Args:
+            transcriptions (list[str]): Расшифровки голосовых сообщений
+            max_concurrency (int): Максимум одновременных запросов к Ollama
+            
+        Returns:
+            list[str]: Тексты протоколов в порядке входных расшифровок
+        """
+        return asyncio.run(self.agenerate_protocol_texts(transcriptions, max_concurrency))
+    
+    def _get_async_client(self):
+        """
+        Возвращает асинхронный HTTP-клиент для Ollama, создавая его при первом обращении.
+        
+        Returns:
+            httpx.AsyncClient: Клиент с таймаутом на чтение каждого фрагмента ответа
+        """
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(timeout=httpx.Timeout(60, connect=5))
+        return self._async_client
+    
     def _basic_protocol_formatting(self, transcription):
         """
         Базовое форматирование протокола без использования LLM.
@@ -145,23 +477,24 @@ class ProtocolGenerator:
             str: Базовый структурированный текст протокола
         """
         # Извлекаем дату из текста или используем текущую
-        date_match = re.search(r'\d{1,2}\s+\w+|\d{1,2}\.\d{1,2}\.\d{2,4}', transcription)
+        date_match = self._date_re.search(transcription)
         if date_match:
             meeting_date = date_match.group(0)
         else:
             meeting_date = datetime.now().strftime("%d.%m.%Y")
         
         # Определяем тему встречи из текста
-        topic_match = re.search(r'(встреч[а-я]+|совещани[а-я]+|обсуждени[а-я]+)\s+(?:по|о|об|с)\s+([^\.]+)', transcription, re.IGNORECASE)
+        topic_match = self._topic_re.search(transcription)
         if topic_match:
             topic = topic_match.group(2).strip()
         else:
             topic = "Обсуждение проекта"
         
-        # Извлекаем вопросы из текста
-        lines = [line.strip() for line in transcription.split('.') if len(line.strip()) > 10]
+        # Извлекаем вопросы из текста: нужны только первые пять предложений
+        sentences = (match.group(0).strip() for match in self._sentence_re.finditer(transcription))
+        lines = islice((sentence for sentence in sentences if len(sentence) > 10), 5)
         questions = []
-        for i, line in enumerate(lines[:5], 1):
+        for i, line in enumerate(lines, 1):
             questions.append(f"{i}. {line}.")
         
         # Формируем протокол
@@ -187,108 +520,188 @@ class ProtocolGenerator:
 """
         return protocol
     
-    def generate_pdf(self, protocol_text, output_path):
+    def _new_document(self):
+        """
+        Создает пустой PDF-документ с зарегистрированными шрифтами LiberationSans.
+        Разбор TTF-файлов не зависит от текста протокола, поэтому может выполняться заранее.
+        
+        Returns:
+            FPDF | None: Документ с первой страницей или None, если шрифты не найдены
+        """
+        # Пути к шрифтам определяются один раз за время работы процесса
+        font_paths = _find_fonts()
+        if font_paths is None:
+            return None
+        regular_font_path, bold_font_path = font_paths
+        
+        # Создаем PDF-документ с поддержкой кириллицы
+        pdf = FPDF()
+        pdf.add_page()
+        
+        # Регистрируем шрифты LiberationSans
+        pdf.add_font("liberation", "", regular_font_path, uni=True)
+        pdf.add_font("liberation", "B", bold_font_path, uni=True)
+        
+        # Устанавливаем шрифт по умолчанию
+        pdf.set_font("liberation", size=12)
+        return pdf
+    
+    def render_pdf(self, protocol_text, pdf=None, cache_dir=None):
+        """
+        Верстает протокол в PDF-документ в памяти, без записи на диск.
+        
+        Args:
+            protocol_text (str): Текст протокола в формате Markdown
+            pdf (FPDF): Заранее подготовленный документ из _new_document (необязательно)
+            cache_dir (str | Path): Директория кэша PDF по хэшу текста (None - без кэша)
+            
+        Returns:
+            bytes | None: Содержимое PDF или None, если шрифты с кириллицей не найдены
+        """
+        # Верстка детерминирована, поэтому одинаковый текст дает одинаковый PDF
+        cache_path = self._pdf_cache_path(protocol_text, cache_dir)
+        if cache_path is not None and cache_path.exists():
+            return cache_path.read_bytes()
+        
+        if pdf is None:
+            pdf = self._new_document()
+        if pdf is None:
+            return None
+        
+        # Шрифт по умолчанию установлен при создании документа
+        current_font = self._TEXT_FONT
+        
+        def use_font(font):
+            # Переключаем шрифт только при реальной смене начертания или размера
+            nonlocal current_font
+            if font != current_font:
+                pdf.set_font("liberation", font[0], size=font[1])
+                current_font = font
+        
+        # Подряд идущие строки обычного текста выводятся одним multi_cell
+        paragraph = []
+        
+        def flush_paragraph():
+            if paragraph:
+                use_font(self._TEXT_FONT)
+                pdf.multi_cell(0, 10, "\n".join(paragraph))
+                paragraph.clear()
+        
+        # Парсинг Markdown и добавление в PDF
+        for line in protocol_text.split('\n'):
+            stripped = line.strip()
+            markup = self._markup_re.match(line)
+            
+            # Обычный текст
+            if markup is None and stripped:
+                paragraph.append(line)
+                continue
+            
+            flush_paragraph()
+            
+            # Обработка заголовков
+            if markup and markup.group(1):
+                size, spacing = self._HEADING_STYLES[len(markup.group(1))]
+                use_font(("B", size))
+                pdf.cell(0, 10, markup.group(2), ln=True)
+                if spacing:
+                    pdf.ln(spacing)
+            # Обработка списков
+            elif markup and markup.group(3):
+                use_font(self._TEXT_FONT)
+                pdf.cell(10, 10, "•", ln=0)
+                pdf.cell(0, 10, markup.group(3), ln=True)
+            elif stripped:
+                use_font(self._TEXT_FONT)
+                pdf.cell(0, 10, stripped, ln=True)
+            # Пустая строка
+            else:
+                pdf.ln(5)
+        
+        flush_paragraph()
+        
+        # Добавляем номер страницы в футер
+        pdf.set_y(-15)
+        pdf.set_font("liberation", size=8)
+        pdf.cell(0, 10, f"Страница {pdf.page_no()}", 0, 0, "C")
+        
+        pdf_bytes = bytes(pdf.output())
+        if cache_path is not None:
+            self._store_cached_pdf(cache_path, pdf_bytes)
+        return pdf_bytes
+    
+    def _pdf_cache_path(self, protocol_text, cache_dir):
+        """
+        Возвращает путь к PDF в кэше для указанного текста протокола.
+        Ключ учитывает класс генератора и действующие параметры верстки,
+        чтобы генераторы с разной версткой не получали PDF друг друга.
+        
+        Args:
+            protocol_text (str): Текст протокола
+            cache_dir (str | Path): Директория кэша (None - кэш отключен)
+            
+        Returns:
+            Path | None: Путь к файлу кэша или None, если кэш отключен
+        """
+        if cache_dir is None:
+            return None
+        key = hashlib.blake2b(protocol_text.encode("utf-8"), digest_size=16)
+        cls = type(self)
+        key.update(f"{cls.__module__}.{cls.__qualname__}".encode("utf-8"))
+        for name in self._RENDER_SETTINGS:
+            value = getattr(self, name)
+            # repr скомпилированного шаблона обрезается, поэтому берем исходную строку и флаги
+            if isinstance(value, re.Pattern):
+                value = (value.pattern, value.flags)
+            key.update(f"{name}={value!r}".encode("utf-8"))
+        return Path(cache_dir) / f"{key.hexdigest()}.pdf"
+    
+    @staticmethod
+    def _store_cached_pdf(cache_path, pdf_bytes):
+        """
+        Сохраняет PDF в кэш. Запись идет во временный файл с последующей атомарной
+        заменой, чтобы параллельные потоки не прочитали недописанный документ.
+        
+        Args:
+            cache_path (Path): Путь к файлу кэша
+            pdf_bytes (bytes): Содержимое PDF
+        """
+        try:
+            _ensure_dir(cache_path.parent)
+            with tempfile.NamedTemporaryFile(dir=cache_path.parent, suffix=".tmp", delete=False) as tmp:
+                tmp.write(pdf_bytes)
+            os.replace(tmp.name, cache_path)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить PDF в кэш: {e}")
+    
+    def generate_pdf(self, protocol_text, output_path, pdf=None, cache_dir=None):
         """
         Создает PDF-документ на основе текста протокола с использованием FPDF2.
         Поддерживает кириллицу через шрифт LiberationSans.
         
         Args:
             protocol_text (str): Текст протокола в формате Markdown
-            output_path (str): Путь для сохранения PDF-файла
+            output_path (str | BinaryIO): Путь для сохранения PDF-файла или файловый объект
+                (например, io.BytesIO для отправки без записи на диск)
+            pdf (FPDF): Заранее подготовленный документ из _new_document (необязательно)
+            cache_dir (str | Path): Директория кэша PDF по хэшу текста (None - без кэша)
             
         Returns:
-            str: Путь к созданному PDF-файлу
+            str | BinaryIO | None: Путь к созданному файлу (PDF или .txt при ошибке верстки),
+                переданный файловый объект с PDF или None, если PDF в файловый объект не записан
         """
         try:
-            # Пути к шрифтам LiberationSans
-            fonts_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fonts')
-            regular_font_path = os.path.join(fonts_dir, 'LiberationSans-Regular.ttf')
-            bold_font_path = os.path.join(fonts_dir, 'LiberationSans-Bold.ttf')
-            
-            # Проверяем наличие шрифтов
-            if not os.path.exists(regular_font_path) or not os.path.exists(bold_font_path):
-                logger.warning(f"Шрифты не найдены в директории проекта: {fonts_dir}")
-                # Пытаемся найти шрифты в системе (для Linux)
-                system_font_paths = {
-                    "regular": [
-                        "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-                        "/usr/share/fonts/TTF/LiberationSans-Regular.ttf"
-                    ],
-                    "bold": [
-                        "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
-                        "/usr/share/fonts/TTF/LiberationSans-Bold.ttf"
-                    ]
-                }
-                
-                for system_path in system_font_paths["regular"]:
-                    if os.path.exists(system_path):
-                        regular_font_path = system_path
-                        logger.info(f"Используется системный шрифт Regular: {regular_font_path}")
-                        break
-                
-                for system_path in system_font_paths["bold"]:
-                    if os.path.exists(system_path):
-                        bold_font_path = system_path
-                        logger.info(f"Используется системный шрифт Bold: {bold_font_path}")
-                        break
-                
-                if not os.path.exists(regular_font_path) or not os.path.exists(bold_font_path):
-                    # Если шрифты не найдены, сохраняем только текстовый файл
-                    logger.warning("Шрифты с поддержкой кириллицы не найдены. Сохраняем только текстовый файл.")
-                    txt_path = output_path.replace('.pdf', '.txt')
-                    with open(txt_path, 'w', encoding='utf-8') as f:
-                        f.write(protocol_text)
-                    return txt_path
-            
-            # Создаем PDF-документ с поддержкой кириллицы
-            pdf = FPDF()
-            pdf.add_page()
-            
-            # Регистрируем шрифты LiberationSans
-            pdf.add_font("liberation", "", regular_font_path, uni=True)
-            pdf.add_font("liberation", "B", bold_font_path, uni=True)
-            
-            # Устанавливаем шрифт по умолчанию
-            pdf.set_font("liberation", size=12)
-            
-            # Парсинг Markdown и добавление в PDF
-            lines = protocol_text.split('\n')
-            for line in lines:
-                # Обработка заголовков
-                if line.startswith('# '):
-                    pdf.set_font("liberation", 'B', size=16)
-                    pdf.cell(0, 10, line[2:], ln=True)
-                    pdf.ln(5)
-                    pdf.set_font("liberation", size=12)
-                elif line.startswith('## '):
-                    pdf.set_font("liberation", 'B', size=14)
-                    pdf.cell(0, 10, line[3:], ln=True)
-                    pdf.ln(3)
-                    pdf.set_font("liberation", size=12)
-                elif line.startswith('### '):
-                    pdf.set_font("liberation", 'B', size=13)
-                    pdf.cell(0, 10, line[4:], ln=True)
-                    pdf.set_font("liberation", size=12)
-                # Обработка списков
-                elif line.strip().startswith('- '):
-                    pdf.cell(10, 10, "•", ln=0)
-                    pdf.cell(0, 10, line.strip()[2:], ln=True)
-                elif re.match(r'^\d+\.\s', line.strip()):
-                    pdf.cell(0, 10, line.strip(), ln=True)
-                # Обычный текст
-                elif line.strip():
-                    pdf.multi_cell(0, 10, line)
-                # Пустая строка
-                else:
-                    pdf.ln(5)
-            
-            # Добавляем номер страницы в футер
-            pdf.set_y(-15)
-            pdf.set_font("liberation", size=8)
-            pdf.cell(0, 10, f"Страница {pdf.page_no()}", 0, 0, "C")
-            
-            # Сохраняем PDF
-            pdf.output(output_path)
+            pdf_bytes = self.render_pdf(protocol_text, pdf, cache_dir)
+            if pdf_bytes is None:
+                # Если шрифты не найдены, сохраняем только текстовый файл
+                logger.warning("Шрифты с поддержкой кириллицы не найдены. Сохраняем только текстовый файл.")
+                return self._write_text_fallback(protocol_text, output_path)
+            
+            # Документ уже сверстан в памяти и записывается одним вызовом
+            if hasattr(output_path, "write"):
+                output_path.write(pdf_bytes)
+                return output_path
+            Path(output_path).write_bytes(pdf_bytes)
             logger.info(f"PDF-протокол создан: {output_path}")
             return output_path
             
@@ -296,15 +709,33 @@ class ProtocolGenerator:
             logger.error(f"Ошибка при создании PDF: {e}")
             # Альтернативный вариант - сохранить как текстовый файл
             try:
-                txt_path = output_path.replace('.pdf', '.txt')
-                with open(txt_path, 'w', encoding='utf-8') as f:
-                    f.write(protocol_text)
-                logger.info(f"Текстовый протокол создан: {txt_path}")
-                return txt_path
+                return self._write_text_fallback(protocol_text, output_path)
             except Exception as txt_error:
                 logger.error(f"Ошибка при создании текстового файла: {txt_error}")
                 return None
     
+    @staticmethod
+    def _write_text_fallback(protocol_text, output_path):
+        """
+        Сохраняет протокол простым текстом, когда PDF создать не удалось.
+        В файловый объект текст не пишется: вызывающий код ожидает в нем PDF.
+        
+        Args:
+            protocol_text (str): Текст протокола
+            output_path (str | BinaryIO): Путь к PDF-файлу (расширение меняется на .txt) или файловый объект
+            
+        Returns:
+            str | None: Путь к текстовому файлу или None для файлового объекта
+        """
+        if hasattr(output_path, "write"):
+            logger.warning("PDF не создан, в файловый объект ничего не записано")
+            return None
+        
+        txt_path = output_path.replace('.pdf', '.txt')
+        Path(txt_path).write_text(protocol_text, encoding='utf-8')
+        logger.info(f"Текстовый протокол создан: {txt_path}")
+        return txt_path
+    
     def process_voice_transcription(self, transcription, output_dir="protocols"):
         """
         Обрабатывает расшифровку голосового сообщения и создает протокол.
@@ -318,20 +749,139 @@ class ProtocolGenerator:
         """
         try:
             # Создаем директорию для протоколов, если она не существует
-            os.makedirs(output_dir, exist_ok=True)
+            _ensure_dir(output_dir)
             
-            # Генерация текста протокола
-            protocol_text = self.generate_protocol_text(transcription)
+            # Шрифты документа разбираются в фоне, пока Ollama генерирует текст
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                document_future = executor.submit(self._new_document)
+                
+                # Генерация текста протокола
+                protocol_text = self.generate_protocol_text(transcription)
+                
+                try:
+                    pdf = document_future.result()
+                except Exception as e:
+                    logger.warning(f"Не удалось заранее подготовить PDF-документ: {e}")
+                    pdf = None
             
-            # Создание имени файла на основе текущей даты и времени
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            pdf_path = os.path.join(output_dir, f"protocol_{timestamp}.pdf")
+            # Создание имени файла на основе текущего времени
+            pdf_path = os.path.join(output_dir, f"protocol_{_file_stamp()}.pdf")
             
             # Создание PDF-документа
-            result_path = self.generate_pdf(protocol_text, pdf_path)
+            result_path = self.generate_pdf(protocol_text, pdf_path, pdf)
             
             return result_path, protocol_text
             
         except Exception as e:
             logger.error(f"Ошибка при обработке расшифровки: {e}")
             return None, protocol_text
+    
+    def process_voice_transcriptions(self, transcriptions, output_dir="protocols", cache_dir=None):
+        """
+        Пакетно обрабатывает несколько расшифровок: тексты генерируются параллельно,
+        после чего PDF верстаются в пуле процессов.
+        
+        Args:
+            transcriptions (list[str]): Расшифровки голосовых сообщений
+            output_dir (str): Директория для сохранения протоколов
+            cache_dir (str | Path): Директория кэша PDF для повторных прогонов (None - без кэша)
+            
+        Returns:
+            list[tuple]: Пары (путь_к_pdf, текст_протокола) в порядке входных расшифровок
+        """
+        _ensure_dir(output_dir)
+        protocol_texts = self.generate_protocol_texts(transcriptions)
+        
+        # Индекс в имени исключает совпадение путей внутри пакета
+        timestamp = _file_stamp()
+        pdf_paths = [
+            os.path.join(output_dir, f"protocol_{timestamp}_{i + 1}.pdf")
+            for i in range(len(protocol_texts))
+        ]
+        
+        result_paths = self.generate_pdfs(list(zip(protocol_texts, pdf_paths)), cache_dir=cache_dir)
+        return list(zip(result_paths, protocol_texts))
+    
+    def generate_pdfs(self, items, max_workers=None, cache_dir=None):
+        """
+        Создает несколько PDF-файлов параллельно в пуле процессов.
+        Верстка FPDF выполняется на чистом Python и упирается в GIL, поэтому
+        независимые документы распределяются по ядрам процессами, а не потоками.
+        
+        Args:
+            items (list[tuple]): Пары (текст_протокола, путь_к_pdf)
+            max_workers (int): Число процессов (по умолчанию по числу ядер)
+            cache_dir (str | Path): Директория кэша PDF по хэшу текста (None - без кэша)
+            
+        Returns:
+            list[str]: Пути к созданным файлам в порядке входных пар
+        """
+        if len(items) <= 1:
+            return [self.generate_pdf(text, path, cache_dir=cache_dir) for text, path in items]
+        
+        # В процессе воссоздается генератор того же класса с теми же параметрами верстки,
+        # поэтому класс должен быть доступен для импорта на уровне модуля
+        generator_class = type(self)
+        settings = {name: vars(self)[name] for name in self._RENDER_SETTINGS if name in vars(self)}
+        
+        workers = min(len(items), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_render_pdf_worker, generator_class, settings, text, path, cache_dir)
+                for text, path in items
+            ]
+            return [future.result() for future in futures]
+    
+    async def aprocess_voice_transcription(self, transcription, output_dir=None, on_progress=None):
+        """
+        Асинхронно обрабатывает расшифровку: текст протокола генерируется потоково,
+        а PDF верстается в памяти в отдельном потоке, не блокируя цикл событий.
+        
+        Args:
+            transcription (str): Расшифрованный текст голосового сообщения
+            output_dir (str): Директория для архивирования протоколов (None - не сохранять на диск)
+            on_progress (callable): Корутина, вызываемая с числом полученных символов
+            
+        Returns:
+            tuple: (содержимое_документа, имя_файла, текст_протокола)
+        """
+        protocol_text = None
+        try:
+            # Документ и шрифты готовятся в отдельном потоке, пока Ollama генерирует текст
+            document_task = asyncio.create_task(asyncio.to_thread(self._new_document))
+            
+            # Генерация текста протокола
+            protocol_text = await self.agenerate_protocol_text(transcription, on_progress)
+            
+            try:
+                document = await document_task
+            except Exception as e:
+                logger.warning(f"Не удалось заранее подготовить PDF-документ: {e}")
+                document = None
+            
+            # Создание имени файла на основе текущего времени
+            filename = f"protocol_{_file_stamp()}.pdf"
+            
+            # Создание PDF-документа
+            try:
+                data = await asyncio.to_thread(self.render_pdf, protocol_text, document)
+            except Exception as e:
+                logger.error(f"Ошибка при создании PDF: {e}")
+                data = None
+            
+            if data is None:
+                # Альтернативный вариант - отправить протокол текстовым файлом
+                logger.warning("PDF не создан. Протокол будет отправлен текстовым файлом.")
+                data = protocol_text.encode("utf-8")
+                filename = filename.replace('.pdf', '.txt')
+            
+            # Сохранение копии протокола на диск, только если включено архивирование
+            if output_dir is not None:
+                _ensure_dir(output_dir)
+                await asyncio.to_thread(Path(output_dir, filename).write_bytes, data)
+            
+            return data, filename, protocol_text
+            
+        except Exception as e:
+            logger.error(f"Ошибка при обработке расшифровки: {e}")
+            return None, None, protocol_text
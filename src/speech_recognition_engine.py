@@ -1,89 +1,531 @@
 """
 Исправленный модуль для распознавания речи с использованием различных движков.
-Поддерживает Whisper и Vosk.
+Поддерживает Whisper, faster-whisper и Vosk.
 """
 
 import os
+import asyncio
+import bisect
+import functools
+import json
 import logging
+import subprocess
+import threading
 from abc import ABC, abstractmethod
 
-import whisper
-from pydub import AudioSegment
+import numpy as np
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
+# Vosk необязателен: без него недоступен только соответствующий движок
+try:
+    from vosk import Model, KaldiRecognizer, SetLogLevel
+except ImportError:
+    Model = KaldiRecognizer = SetLogLevel = None
+
+from config import (
+    SPEECH_RECOGNITION_ENGINE,
+    WHISPER_MODEL,
+    WHISPER_LANGUAGE,
+    QUANTIZATION,
+    VAD_FILTER,
+    VAD_MIN_SILENCE_MS,
+    WHISPER_CPU_THREADS,
+    VOSK_MODEL_PATH,
+    RECOGNITION_WORKERS
+)
+
+# Логирование настраивается в точке входа (bot.py)
 logger = logging.getLogger(__name__)
 
+# Частота дискретизации, с которой работают Whisper и Vosk
+SAMPLE_RATE = 16000
+
+
+@functools.lru_cache(maxsize=1)
+def _import_whisper():
+    """
+    Импортирует openai-whisper и torch при первом обращении.
+    Пакеты тяжелые, поэтому не загружаются, если выбран другой движок.
+    
+    Returns:
+        tuple: (модуль torch, модуль whisper)
+    """
+    import torch
+    import whisper
+    return torch, whisper
+
+
+async def decode_audio_bytes(data, sample_rate=SAMPLE_RATE):
+    """
+    Декодирует аудио из памяти в моно PCM через ffmpeg без временных файлов.
+    
+    Args:
+        data (bytes | bytearray): Содержимое аудиофайла (например, OGG/Opus из Telegram).
+        sample_rate (int): Частота дискретизации результата.
+        
+    Returns:
+        numpy.ndarray: Сигнал float32 в диапазоне [-1, 1].
+    """
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-nostdin", "-loglevel", "error",
+        "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-ar", str(sample_rate),
+        "pipe:1",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate(bytes(data))
+    if process.returncode != 0:
+        raise RuntimeError(f"Не удалось декодировать аудио: {stderr.decode(errors='ignore').strip()}")
+    
+    return np.frombuffer(stdout, np.int16).astype(np.float32) / 32768.0
+
+
 class SpeechRecognitionEngine(ABC):
     """Абстрактный класс для движков распознавания речи."""
     
+    # Движок распознает пакет быстрее, чем те же записи по отдельности.
+    # Иначе BatchedRecognizer не копит записи, а распознает их параллельно в пуле потоков
+    SUPPORTS_BATCHING = False
+    
     @abstractmethod
-    def recognize_speech(self, audio_path):
+    def recognize_speech(self, audio):
         """
-        Распознает речь из аудиофайла.
+        Распознает речь из аудиофайла или декодированного сигнала.
         
         Args:
-            audio_path (str): Путь к аудиофайлу.
+            audio (str | numpy.ndarray): Путь к аудиофайлу или моно сигнал float32 с частотой SAMPLE_RATE.
             
         Returns:
             str: Распознанный текст.
         """
         pass
     
+    def recognize_batch(self, audios):
+        """
+        Распознает речь из нескольких записей.
+        
+        Args:
+            audios (list): Пути к аудиофайлам или моно сигналы float32 16 кГц.
+            
+        Returns:
+            list[str]: Распознанные тексты в исходном порядке.
+        """
+        return [self.recognize_speech(audio) for audio in audios]
+    
     # Для обратной совместимости
-    def recognize(self, audio_path):
+    def recognize(self, audio):
         """Алиас для recognize_speech для обратной совместимости."""
-        return self.recognize_speech(audio_path)
+        return self.recognize_speech(audio)
 
 
 class WhisperEngine(SpeechRecognitionEngine):
     """Движок распознавания речи на основе OpenAI Whisper."""
     
-    def __init__(self, model_name="tiny"):
+    SUPPORTS_BATCHING = True
+    # Репозиторий Silero VAD закреплен на релизе: без тега torch.hub берет ветку master,
+    # и смена формата utils в новой версии молча отключила бы фильтрацию пауз
+    SILERO_VAD_REPO = "snakers4/silero-vad:v4.0"
+    
+    def __init__(self, model_name="tiny", quantization="int8", vad_filter=True, min_silence_ms=500,
+                 language="ru"):
         """
         Инициализирует движок Whisper.
         
         Args:
             model_name (str): Название модели Whisper (tiny, base, small, medium, large).
+            quantization (str): Точность весов модели (int8, fp16, fp32).
+            vad_filter (bool): Вырезать паузы с помощью Silero VAD перед распознаванием.
+            min_silence_ms (int): Минимальная длительность паузы, которая вырезается.
+            language (str): Язык речи (None - автоопределение на каждом сообщении).
         """
-        logger.info(f"Инициализация Whisper с моделью {model_name}")
+        if quantization not in ("int8", "fp16", "fp32"):
+            raise ValueError(f"Неизвестный режим квантизации: {quantization}")
+        
+        logger.info(f"Инициализация Whisper с моделью {model_name} ({quantization})")
         try:
+            torch, whisper = _import_whisper()
             self.model = whisper.load_model(model_name)
+            self.fp16 = False
+            
+            if torch.cuda.is_available():
+                # Динамическая квантизация работает только на CPU, на GPU используем половинную точность
+                if quantization != "fp32":
+                    self.model = self.model.half()
+                    self.fp16 = True
+            elif quantization == "int8":
+                self.model = self._quantize_dynamic(self.model)
+            elif quantization == "fp16":
+                logger.warning("fp16 не поддерживается на CPU, используется fp32")
+            
             logger.info("Модель Whisper успешно загружена")
         except Exception as e:
             logger.error(f"Ошибка при загрузке модели Whisper: {e}")
             raise
+        
+        # Параметры декодирования фиксируются один раз: заданный язык
+        # избавляет от отдельного прохода энкодера для его определения
+        self._decode_options = {"task": "transcribe", "language": language, "fp16": self.fp16}
+        
+        # Декодер Whisper на каждый вызов вешает хуки kv-кэша на общие слои модели,
+        # поэтому параллельные transcribe/decode портят кэш друг друга
+        self._inference_lock = threading.Lock()
+        
+        self.vad_model = None
+        self.min_silence_ms = min_silence_ms
+        if vad_filter:
+            self._load_vad()
+    
+    def _load_vad(self):
+        """Загружает модель Silero VAD; при ошибке распознавание идет без фильтрации пауз."""
+        try:
+            torch, _ = _import_whisper()
+            self.vad_model, utils = torch.hub.load(self.SILERO_VAD_REPO, "silero_vad", trust_repo=True)
+            self.get_speech_timestamps, _, _, _, self.collect_chunks = utils
+            # Модель VAD хранит состояние между фреймами, поэтому не используется из нескольких потоков сразу
+            self.vad_lock = threading.Lock()
+            logger.info("Модель Silero VAD успешно загружена")
+        except Exception as e:
+            self.vad_model = None
+            logger.warning(f"Не удалось загрузить Silero VAD: {e}. Паузы не будут вырезаться.")
     
-    def recognize_speech(self, audio_path):
+    def _remove_silence(self, audio):
         """
-        Распознает речь из аудиофайла с помощью Whisper.
+        Оставляет в сигнале только участки с речью.
         
         Args:
-            audio_path (str): Путь к аудиофайлу.
+            audio (numpy.ndarray): Моно сигнал float32 16 кГц.
+            
+        Returns:
+            numpy.ndarray: Склеенные участки речи (пустой массив, если речи нет).
+        """
+        torch, _ = _import_whisper()
+        wav = torch.from_numpy(audio)
+        with self.vad_lock:
+            timestamps = self.get_speech_timestamps(
+                wav,
+                self.vad_model,
+                sampling_rate=SAMPLE_RATE,
+                min_silence_duration_ms=self.min_silence_ms
+            )
+        if not timestamps:
+            return audio[:0]
+        return self.collect_chunks(timestamps, wav).numpy()
+    
+    @staticmethod
+    def _quantize_dynamic(model):
+        """
+        Квантизует линейные слои модели в int8 для инференса на CPU.
+        
+        Args:
+            model: Модель Whisper в fp32.
+            
+        Returns:
+            Модель с динамически квантизованными nn.Linear.
+        """
+        # whisper.model.Linear наследует nn.Linear только ради приведения типов под fp16,
+        # а quantize_dynamic сравнивает типы строго, поэтому возвращаем базовый класс
+        torch, _ = _import_whisper()
+        for module in model.modules():
+            if isinstance(module, torch.nn.Linear):
+                module.__class__ = torch.nn.Linear
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    
+    def _prepare_audio(self, audio):
+        """
+        Подготавливает аудио к распознаванию: вырезает паузы.
+        Файлы любого формата Whisper декодирует сам через ffmpeg.
+        
+        Args:
+            audio (str | numpy.ndarray): Путь к аудиофайлу или моно сигнал float32 16 кГц.
+            
+        Returns:
+            str | numpy.ndarray: Путь к файлу или сигнал (пустой, если речи нет).
+        """
+        if isinstance(audio, np.ndarray):
+            logger.info(f"Распознавание речи из сигнала длительностью {len(audio) / SAMPLE_RATE:.1f} с")
+        else:
+            logger.info(f"Распознавание речи из файла {audio}")
+            if self.vad_model is not None:
+                _, whisper = _import_whisper()
+                audio = whisper.load_audio(audio)
+        
+        # Вырезаем паузы, чтобы энкодер не обрабатывал тишину
+        if self.vad_model is not None:
+            audio = self._remove_silence(audio)
+        
+        return audio
+    
+    def recognize_speech(self, audio):
+        """
+        Распознает речь из аудиофайла или сигнала с помощью Whisper.
+        
+        Args:
+            audio (str | numpy.ndarray): Путь к аудиофайлу или моно сигнал float32 16 кГц.
+            
+        Returns:
+            str: Распознанный текст.
+        """
+        try:
+            audio = self._prepare_audio(audio)
+        except Exception as e:
+            logger.error(f"Ошибка при подготовке аудио для Whisper: {e}")
+            return "Ошибка распознавания речи."
+        
+        if isinstance(audio, np.ndarray) and audio.size == 0:
+            logger.info("Речь в аудио не обнаружена")
+            return ""
+        return self._transcribe_prepared(audio)
+    
+    def _transcribe_prepared(self, audio):
+        """
+        Распознает аудио, уже прошедшее _prepare_audio (повторно VAD не применяется).
+        
+        Args:
+            audio (str | numpy.ndarray): Путь к аудиофайлу или подготовленный сигнал.
             
         Returns:
             str: Распознанный текст.
         """
         try:
-            # Конвертация аудио в формат WAV, если это не WAV
-            if not audio_path.lower().endswith('.wav'):
-                wav_path = audio_path.rsplit('.', 1)[0] + '.wav'
-                audio = AudioSegment.from_file(audio_path)
-                audio.export(wav_path, format="wav")
-                audio_path = wav_path
-            
-            # Распознавание речи
-            logger.info(f"Распознавание речи из файла {audio_path}")
-            result = self.model.transcribe(audio_path)
+            with self._inference_lock:
+                result = self.model.transcribe(audio, **self._decode_options)
             return result["text"].strip()
         except Exception as e:
             logger.error(f"Ошибка при распознавании речи с Whisper: {e}")
             return "Ошибка распознавания речи."
+    
+    def recognize_batch(self, audios):
+        """
+        Распознает несколько записей, прогоняя короткие (до 30 с) одним пакетом через модель.
+        
+        Args:
+            audios (list): Пути к аудиофайлам или моно сигналы float32 16 кГц.
+            
+        Returns:
+            list[str]: Распознанные тексты в исходном порядке.
+        """
+        if len(audios) == 1:
+            return [self.recognize_speech(audios[0])]
+        
+        torch, whisper = _import_whisper()
+        results = [None] * len(audios)
+        short = []
+        for i, audio in enumerate(audios):
+            try:
+                audio = self._prepare_audio(audio)
+                if isinstance(audio, str):
+                    audio = whisper.load_audio(audio)
+            except Exception as e:
+                logger.error(f"Ошибка при подготовке аудио для Whisper: {e}")
+                results[i] = "Ошибка распознавания речи."
+                continue
+            
+            if audio.size == 0:
+                results[i] = ""
+            elif len(audio) <= whisper.audio.N_SAMPLES:
+                short.append((i, audio))
+            else:
+                # Длинные записи распознаются окнами по 30 с, как и раньше
+                results[i] = self._transcribe_prepared(audio)
+        
+        if short:
+            try:
+                # Энкодер обрабатывает все мел-спектрограммы одним вызовом
+                mel = torch.stack([
+                    whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), self.model.dims.n_mels)
+                    for _, audio in short
+                ]).to(self.model.device)
+                if self.fp16:
+                    mel = mel.half()
+                
+                with self._inference_lock:
+                    decoded = whisper.decode(self.model, mel, whisper.DecodingOptions(**self._decode_options))
+                for (i, _), result in zip(short, decoded):
+                    results[i] = result.text.strip()
+            except Exception as e:
+                logger.warning(f"Ошибка пакетного распознавания Whisper: {e}. Распознаю записи по одной.")
+                for i, audio in short:
+                    results[i] = self._transcribe_prepared(audio)
+        
+        return results
+
+
+class WhisperCT2Engine(SpeechRecognitionEngine):
+    """Движок распознавания речи на основе faster-whisper (CTranslate2)."""
+    
+    # Тип вычислений CTranslate2 для каждого устройства и режима квантизации
+    _COMPUTE_TYPES = {
+        "cpu": {"int8": "int8", "fp16": "float32", "fp32": "float32"},
+        "cuda": {"int8": "int8_float16", "fp16": "float16", "fp32": "float32"},
+    }
+    
+    # Число фрагментов записи, декодируемых за один проход BatchedInferencePipeline
+    BATCH_SIZE = 8
+    
+    def __init__(self, model_name="tiny", quantization="int8", cpu_threads=0, num_workers=1,
+                 vad_filter=True, min_silence_ms=500, language="ru"):
+        """
+        Инициализирует движок faster-whisper.
+        
+        Args:
+            model_name (str): Название модели Whisper (tiny, base, small, medium, large).
+            quantization (str): Точность весов модели (int8, fp16, fp32).
+            cpu_threads (int): Количество потоков CPU на одно распознавание
+                (0 - ядра поровну между num_workers).
+            num_workers (int): Количество параллельных распознаваний на одной модели.
+            vad_filter (bool): Вырезать паузы встроенным VAD перед распознаванием.
+            min_silence_ms (int): Минимальная длительность паузы, которая вырезается.
+            language (str): Язык речи (None - автоопределение на каждом сообщении).
+        """
+        self.vad_filter = vad_filter
+        self.vad_parameters = {"min_silence_duration_ms": min_silence_ms}
+        self.language = language
+        if quantization not in ("int8", "fp16", "fp32"):
+            raise ValueError(f"Неизвестный режим квантизации: {quantization}")
+        
+        try:
+            import ctranslate2
+            from faster_whisper import WhisperModel, BatchedInferencePipeline
+            
+            device = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+            compute_type = self._COMPUTE_TYPES[device][quantization]
+            if device == "cpu" and quantization == "fp16":
+                logger.warning("fp16 не поддерживается на CPU, используется fp32")
+            
+            # При 0 CTranslate2 берет 4 потока (или OMP_NUM_THREADS), а не число ядер,
+            # поэтому делим ядра между параллельными распознаваниями сами
+            if cpu_threads <= 0:
+                cpu_threads = max(1, (os.cpu_count() or 1) // max(1, num_workers))
+            
+            logger.info(f"Инициализация faster-whisper с моделью {model_name} ({device}, {compute_type})")
+            self.model = WhisperModel(
+                model_name,
+                device=device,
+                compute_type=compute_type,
+                cpu_threads=cpu_threads,
+                num_workers=num_workers
+            )
+            # Конвейер нарезает запись по VAD и декодирует фрагменты пакетами.
+            # Без VAD фрагменты не выделяются, поэтому используется обычная модель
+            self._pipeline = BatchedInferencePipeline(model=self.model) if vad_filter else None
+            # Пакет из нескольких сообщений собирается из фрагментов речи, найденных VAD,
+            # поэтому без конвейера записи распознаются параллельно по одной
+            self.SUPPORTS_BATCHING = self._pipeline is not None
+            logger.info("Модель faster-whisper успешно загружена")
+        except ImportError:
+            logger.error("Библиотека faster-whisper не установлена")
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке модели faster-whisper: {e}")
+            raise
+    
+    def recognize_speech(self, audio):
+        """
+        Распознает речь из аудиофайла или сигнала с помощью faster-whisper.
+        
+        Args:
+            audio (str | numpy.ndarray): Путь к аудиофайлу или моно сигнал float32 16 кГц.
+            
+        Returns:
+            str: Распознанный текст.
+        """
+        try:
+            if isinstance(audio, np.ndarray):
+                logger.info(f"Распознавание речи из сигнала длительностью {len(audio) / SAMPLE_RATE:.1f} с")
+            else:
+                logger.info(f"Распознавание речи из файла {audio}")
+            
+            # Сегменты генерируются лениво, декодирование идет по мере итерации
+            if self._pipeline is not None:
+                segments, _ = self._pipeline.transcribe(
+                    audio,
+                    language=self.language,
+                    task="transcribe",
+                    beam_size=1,
+                    vad_filter=True,
+                    vad_parameters=self.vad_parameters,
+                    batch_size=self.BATCH_SIZE
+                )
+            else:
+                segments, _ = self.model.transcribe(
+                    audio,
+                    language=self.language,
+                    task="transcribe",
+                    beam_size=1,
+                    vad_filter=False
+                )
+            return " ".join(segment.text.strip() for segment in segments).strip()
+        except Exception as e:
+            logger.error(f"Ошибка при распознавании речи с faster-whisper: {e}")
+            return "Ошибка распознавания речи."
+    
+    def recognize_batch(self, audios):
+        """
+        Распознает несколько записей за один проход BatchedInferencePipeline.
+        Фрагменты речи всех записей декодируются общими пакетами по BATCH_SIZE,
+        поэтому короткие сообщения не занимают по отдельному неполному пакету.
+        
+        Args:
+            audios (list): Пути к аудиофайлам или моно сигналы float32 16 кГц.
+            
+        Returns:
+            list[str]: Распознанные тексты в исходном порядке.
+        """
+        if self._pipeline is None or len(audios) == 1:
+            return super().recognize_batch(audios)
+        
+        try:
+            from faster_whisper import decode_audio
+            from faster_whisper.vad import VadOptions, get_speech_timestamps, merge_segments
+            
+            # Конвейер сам режет запись на фрагменты не длиннее 30 с; для склеенных
+            # записей фрагменты размечаются по каждой записи отдельно, чтобы ни один
+            # фрагмент не захватил конец одного сообщения и начало другого
+            vad_options = VadOptions(
+                min_silence_duration_ms=self.vad_parameters["min_silence_duration_ms"],
+                max_speech_duration_s=self._pipeline.model.feature_extractor.chunk_length
+            )
+            signals = []
+            clips = []
+            offsets = []
+            offset = 0
+            for audio in audios:
+                if not isinstance(audio, np.ndarray):
+                    audio = decode_audio(audio, sampling_rate=SAMPLE_RATE)
+                for clip in merge_segments(get_speech_timestamps(audio, vad_options), vad_options, SAMPLE_RATE):
+                    clips.append({"start": clip["start"] + offset, "end": clip["end"] + offset})
+                signals.append(audio)
+                offsets.append(offset)
+                offset += len(audio)
+            
+            texts = [[] for _ in audios]
+            if clips:
+                segments, _ = self._pipeline.transcribe(
+                    np.concatenate(signals),
+                    language=self.language,
+                    task="transcribe",
+                    beam_size=1,
+                    clip_timestamps=clips,
+                    batch_size=self.BATCH_SIZE
+                )
+                for segment in segments:
+                    # Сегмент лежит внутри одного фрагмента, а значит и одной записи
+                    middle = (segment.start + segment.end) / 2 * SAMPLE_RATE
+                    texts[bisect.bisect_right(offsets, middle) - 1].append(segment.text.strip())
+            return [" ".join(parts).strip() for parts in texts]
+        except Exception as e:
+            logger.warning(f"Ошибка пакетного распознавания faster-whisper: {e}. Распознаю записи по одной.")
+            return super().recognize_batch(audios)
 
 
 class VoskEngine(SpeechRecognitionEngine):
     """Движок распознавания речи на основе Vosk."""
     
+    # Размер порции PCM для распознавателя: 32000 кадров по 2 байта (2 с при 16 кГц).
+    # Крупные порции сокращают число переходов между Python и Kaldi
+    CHUNK_BYTES = 64000
+    
     def __init__(self, model_path="model"):
         """
         Инициализирует движок Vosk.
@@ -91,13 +533,11 @@ class VoskEngine(SpeechRecognitionEngine):
         Args:
             model_path (str): Путь к модели Vosk.
         """
+        if Model is None:
+            logger.error("Библиотека Vosk не установлена")
+            raise ImportError("Библиотека Vosk не установлена")
+        
         try:
-            from vosk import Model, KaldiRecognizer, SetLogLevel
-            import wave
-            
-            self.KaldiRecognizer = KaldiRecognizer
-            self.wave = wave
-            
             # Отключение логов Vosk
             SetLogLevel(-1)
             
@@ -108,66 +548,212 @@ class VoskEngine(SpeechRecognitionEngine):
             
             self.model = Model(model_path)
             logger.info("Модель Vosk успешно загружена")
-        except ImportError:
-            logger.error("Библиотека Vosk не установлена")
-            raise
         except Exception as e:
             logger.error(f"Ошибка при инициализации Vosk: {e}")
             raise
     
-    def recognize_speech(self, audio_path):
+    def recognize_speech(self, audio):
         """
-        Распознает речь из аудиофайла с помощью Vosk.
+        Распознает речь из аудиофайла или сигнала с помощью Vosk.
         
         Args:
-            audio_path (str): Путь к аудиофайлу.
+            audio (str | numpy.ndarray): Путь к аудиофайлу или моно сигнал float32 16 кГц.
             
         Returns:
             str: Распознанный текст.
         """
         try:
-            # Конвертация аудио в формат WAV, если это не WAV
-            if not audio_path.lower().endswith('.wav'):
-                wav_path = audio_path.rsplit('.', 1)[0] + '.wav'
-                audio = AudioSegment.from_file(audio_path)
-                audio = audio.set_channels(1)  # Vosk требует моно аудио
-                audio = audio.set_frame_rate(16000)  # Рекомендуемая частота дискретизации для Vosk
-                audio.export(wav_path, format="wav")
-                audio_path = wav_path
-            
-            # Распознавание речи
-            logger.info(f"Распознавание речи из файла {audio_path}")
-            wf = self.wave.open(audio_path, "rb")
-            
-            if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getcomptype() != "NONE":
-                logger.warning("Аудио не соответствует требованиям Vosk (моно, 16 бит, PCM)")
-            
-            rec = self.KaldiRecognizer(self.model, wf.getframerate())
+            if isinstance(audio, np.ndarray):
+                logger.info(f"Распознавание речи из сигнала длительностью {len(audio) / SAMPLE_RATE:.1f} с")
+                pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+                chunks = (
+                    pcm[offset:offset + self.CHUNK_BYTES]
+                    for offset in range(0, len(pcm), self.CHUNK_BYTES)
+                )
+            else:
+                logger.info(f"Распознавание речи из файла {audio}")
+                chunks = self._stream_file(audio)
+            
+            rec = KaldiRecognizer(self.model, SAMPLE_RATE)
             rec.SetWords(True)
             
-            result = ""
-            while True:
-                data = wf.readframes(4000)
-                if len(data) == 0:
-                    break
-                if rec.AcceptWaveform(data):
-                    pass
+            for chunk in chunks:
+                rec.AcceptWaveform(chunk)
             
             final_result = rec.FinalResult()
-            import json
             result_dict = json.loads(final_result)
             return result_dict.get("text", "").strip()
         except Exception as e:
             logger.error(f"Ошибка при распознавании речи с Vosk: {e}")
             return "Ошибка распознавания речи."
+    
+    def _stream_file(self, audio_path):
+        """
+        Декодирует аудиофайл через ffmpeg и отдает моно PCM 16 бит порциями по мере
+        декодирования, без промежуточного WAV на диске и без загрузки файла в память целиком.
+        
+        Args:
+            audio_path (str): Путь к аудиофайлу.
+            
+        Yields:
+            bytes: Порции сырых отсчетов s16le с частотой SAMPLE_RATE.
+        """
+        process = subprocess.Popen(
+            ["ffmpeg", "-nostdin", "-loglevel", "quiet",
+             "-i", audio_path,
+             "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE),
+             "pipe:1"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=10**7
+        )
+        try:
+            while chunk := process.stdout.read(self.CHUNK_BYTES):
+                yield chunk
+            if process.wait() != 0:
+                raise RuntimeError(f"Не удалось декодировать аудио: ffmpeg завершился с кодом {process.returncode}")
+        finally:
+            process.stdout.close()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+
+class BatchedRecognizer:
+    """
+    Объединяет записи, пришедшие почти одновременно, в пакеты для движка распознавания.
+    Пакет отправляется в пул потоков, как только набрано max_batch_size записей
+    или истекло timeout секунд с момента прихода первой.
+    
+    Для движков без пакетного распознавания (SUPPORTS_BATCHING = False) записи
+    не копятся, а сразу распознаются параллельно в пуле потоков.
+    """
+    
+    def __init__(self, engine, executor=None, max_batch_size=8, timeout=0.05):
+        """
+        Инициализирует пакетный распознаватель.
+        
+        Args:
+            engine (SpeechRecognitionEngine): Движок распознавания речи.
+            executor: Пул для распознавания вне цикла событий (None - пул по умолчанию).
+            max_batch_size (int): Максимальное количество записей в пакете.
+            timeout (float): Время ожидания следующих записей в секундах.
+        """
+        self.engine = engine
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.timeout = timeout
+        # Очередь создается в submit: до Python 3.10 она привязывается к текущему циклу
+        # событий, а при импорте модуля рабочий цикл (например, uvloop) еще не запущен
+        self._queue = None
+        self._collector = None
+        self._batches = set()
+    
+    async def submit(self, audio):
+        """
+        Ставит запись в очередь и ждет результата распознавания.
+        
+        Args:
+            audio (str | numpy.ndarray): Путь к аудиофайлу или моно сигнал float32 16 кГц.
+            
+        Returns:
+            str: Распознанный текст.
+        """
+        loop = asyncio.get_running_loop()
+        if not self.engine.SUPPORTS_BATCHING:
+            return await loop.run_in_executor(self.executor, self.engine.recognize_speech, audio)
+        
+        if self._collector is None or self._collector.done():
+            if self._queue is None:
+                self._queue = asyncio.Queue()
+            self._collector = asyncio.create_task(self._collect())
+        
+        future = loop.create_future()
+        await self._queue.put((audio, future))
+        return await future
+    
+    async def close(self):
+        """
+        Останавливает сборку пакетов и отменяет ожидающие распознавания.
+        Вызывается при остановке приложения, до закрытия цикла событий.
+        """
+        tasks = list(self._batches)
+        if self._collector is not None:
+            tasks.append(self._collector)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        
+        # Записи, не попавшие ни в один пакет, остаются в очереди
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            future.cancel()
+        
+        self._collector = None
+        self._queue = None
+        self._batches.clear()
+    
+    async def _collect(self):
+        """Собирает записи из очереди в пакеты и запускает их распознавание."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.timeout
+            
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            
+            # Следующий пакет собирается, пока текущий распознается
+            task = asyncio.create_task(self._process(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+    
+    async def _process(self, batch):
+        """
+        Распознает пакет в пуле потоков и передает результаты ожидающим.
+        
+        Args:
+            batch (list): Пары (аудио, future).
+        """
+        audios = [audio for audio, _ in batch]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                self.engine.recognize_batch,
+                audios
+            )
+        except asyncio.CancelledError:
+            # Поток пула досчитает пакет сам, но результат уже никому не нужен
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном распознавании речи: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
 
 
+@functools.lru_cache(maxsize=4)
 def get_speech_recognition_engine(engine_type, **kwargs):
     """
     Фабричный метод для создания движка распознавания речи.
+    Экземпляры кэшируются по типу движка и параметрам, поэтому повторный вызов
+    с теми же аргументами не загружает модель в память второй раз.
     
     Args:
-        engine_type (str): Тип движка ("whisper" или "vosk").
+        engine_type (str): Тип движка ("whisper", "faster-whisper" или "vosk").
         **kwargs: Дополнительные параметры для движка.
         
     Returns:
@@ -175,9 +761,62 @@ def get_speech_recognition_engine(engine_type, **kwargs):
     """
     if engine_type.lower() == "whisper":
         model_name = kwargs.get("model_name", "tiny")
-        return WhisperEngine(model_name)
+        quantization = kwargs.get("quantization", "int8")
+        vad_filter = kwargs.get("vad_filter", True)
+        min_silence_ms = kwargs.get("min_silence_ms", 500)
+        language = kwargs.get("language", "ru")
+        return WhisperEngine(model_name, quantization, vad_filter, min_silence_ms, language)
+    elif engine_type.lower() == "faster-whisper":
+        model_name = kwargs.get("model_name", "tiny")
+        quantization = kwargs.get("quantization", "int8")
+        cpu_threads = kwargs.get("cpu_threads", 0)
+        num_workers = kwargs.get("num_workers", 1)
+        vad_filter = kwargs.get("vad_filter", True)
+        min_silence_ms = kwargs.get("min_silence_ms", 500)
+        language = kwargs.get("language", "ru")
+        return WhisperCT2Engine(
+            model_name, quantization, cpu_threads, num_workers, vad_filter, min_silence_ms, language
+        )
     elif engine_type.lower() == "vosk":
         model_path = kwargs.get("model_path", "model")
         return VoskEngine(model_path)
     else:
         raise ValueError(f"Неизвестный тип движка: {engine_type}")
+
+
+def get_configured_speech_recognition_engine():
+    """
+    Возвращает движок распознавания речи, выбранный в настройках (config.py).
+    
+    Returns:
+        SpeechRecognitionEngine: Общий для всего процесса экземпляр движка.
+    """
+    engine_type = SPEECH_RECOGNITION_ENGINE.lower()
+    if engine_type == "whisper":
+        return get_speech_recognition_engine(
+            "whisper",
+            model_name=WHISPER_MODEL,
+            quantization=QUANTIZATION,
+            vad_filter=VAD_FILTER,
+            min_silence_ms=VAD_MIN_SILENCE_MS,
+            language=WHISPER_LANGUAGE
+        )
+    elif engine_type == "faster-whisper":
+        return get_speech_recognition_engine(
+            "faster-whisper",
+            model_name=WHISPER_MODEL,
+            quantization=QUANTIZATION,
+            cpu_threads=WHISPER_CPU_THREADS,
+            num_workers=RECOGNITION_WORKERS,
+            vad_filter=VAD_FILTER,
+            min_silence_ms=VAD_MIN_SILENCE_MS,
+            language=WHISPER_LANGUAGE
+        )
+    elif engine_type == "vosk":
+        return get_speech_recognition_engine(
+            "vosk",
+            model_path=VOSK_MODEL_PATH
+        )
+    else:
+        logger.error(f"Неизвестный движок распознавания речи: {SPEECH_RECOGNITION_ENGINE}")
+        raise ValueError(f"Неизвестный движок распознавания речи: {SPEECH_RECOGNITION_ENGINE}")
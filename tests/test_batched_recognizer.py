@@ -0,0 +1,150 @@
+"""
+Модуль для тестирования пакетного распознавателя BatchedRecognizer.
+Проверяет сборку пакетов по размеру и таймауту, передачу ошибок ожидающим
+и параллельное распознавание для движков без пакетного режима.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Модули src импортируют друг друга по имени, поэтому добавляем src в путь
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from speech_recognition_engine import BatchedRecognizer, SpeechRecognitionEngine
+
+
+class RecordingBatchEngine(SpeechRecognitionEngine):
+    """Движок с пакетным режимом, запоминающий состав каждого пакета."""
+
+    SUPPORTS_BATCHING = True
+
+    def __init__(self):
+        self.batches = []
+
+    def recognize_speech(self, audio):
+        return f"text:{audio}"
+
+    def recognize_batch(self, audios):
+        self.batches.append(list(audios))
+        return [self.recognize_speech(audio) for audio in audios]
+
+
+class FailingBatchEngine(RecordingBatchEngine):
+    """Движок, у которого пакетное распознавание завершается ошибкой."""
+
+    def recognize_batch(self, audios):
+        raise RuntimeError("сбой модели")
+
+
+class ParallelEngine(SpeechRecognitionEngine):
+    """Движок без пакетного режима: оба вызова должны выполняться одновременно."""
+
+    def __init__(self, parties):
+        self.barrier = threading.Barrier(parties, timeout=5)
+
+    def recognize_speech(self, audio):
+        # При последовательном распознавании барьер не дождется второго потока
+        self.barrier.wait()
+        return f"text:{audio}"
+
+    def recognize_batch(self, audios):
+        raise AssertionError("recognize_batch не должен вызываться")
+
+
+async def submit_all(recognizer, audios):
+    """Отправляет записи одновременно и возвращает результаты в исходном порядке."""
+    return await asyncio.gather(
+        *(recognizer.submit(audio) for audio in audios),
+        return_exceptions=True
+    )
+
+
+def test_flush_by_batch_size():
+    """Пакет отправляется, как только набрано max_batch_size записей, не дожидаясь таймаута."""
+    engine = RecordingBatchEngine()
+
+    async def run():
+        recognizer = BatchedRecognizer(engine, max_batch_size=2, timeout=30)
+        return await asyncio.wait_for(submit_all(recognizer, ["a", "b", "c", "d"]), 5)
+
+    results = asyncio.run(run())
+    assert results == ["text:a", "text:b", "text:c", "text:d"]
+    assert engine.batches == [["a", "b"], ["c", "d"]]
+
+
+def test_flush_by_timeout():
+    """Неполный пакет отправляется по истечении таймаута."""
+    engine = RecordingBatchEngine()
+
+    async def run():
+        recognizer = BatchedRecognizer(engine, max_batch_size=8, timeout=0.05)
+        return await asyncio.wait_for(submit_all(recognizer, ["a", "b", "c"]), 5)
+
+    started = time.monotonic()
+    results = asyncio.run(run())
+    assert results == ["text:a", "text:b", "text:c"]
+    assert engine.batches == [["a", "b", "c"]]
+    assert time.monotonic() - started < 5
+
+
+def test_exception_propagates_to_every_future():
+    """Ошибка пакетного распознавания передается каждому ожидающему."""
+    engine = FailingBatchEngine()
+
+    async def run():
+        recognizer = BatchedRecognizer(engine, max_batch_size=2, timeout=0.05)
+        return await asyncio.wait_for(submit_all(recognizer, ["a", "b", "c"]), 5)
+
+    results = asyncio.run(run())
+    assert len(results) == 3
+    for result in results:
+        assert isinstance(result, RuntimeError)
+        assert str(result) == "сбой модели"
+
+
+def test_engine_without_batching_runs_in_parallel():
+    """Записи для движка без пакетного режима распознаются параллельно в пуле потоков."""
+    engine = ParallelEngine(parties=2)
+
+    async def run():
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            recognizer = BatchedRecognizer(engine, executor, max_batch_size=8, timeout=30)
+            return await asyncio.wait_for(submit_all(recognizer, ["a", "b"]), 10)
+
+    assert asyncio.run(run()) == ["text:a", "text:b"]
+
+
+def test_close_cancels_pending_submissions():
+    """close() останавливает сборщик и отменяет записи в распознающемся пакете и в очереди."""
+    release = threading.Event()
+    
+    class BlockingBatchEngine(RecordingBatchEngine):
+        def recognize_batch(self, audios):
+            release.wait(5)
+            return super().recognize_batch(audios)
+    
+    async def run():
+        recognizer = BatchedRecognizer(BlockingBatchEngine(), max_batch_size=1, timeout=30)
+        pending = [asyncio.ensure_future(recognizer.submit(audio)) for audio in ["a", "b"]]
+        await asyncio.sleep(0.1)
+        await asyncio.wait_for(recognizer.close(), 5)
+        results = await asyncio.wait_for(asyncio.gather(*pending, return_exceptions=True), 5)
+        release.set()
+        return recognizer, results
+    
+    recognizer, results = asyncio.run(run())
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert recognizer._collector is None and not recognizer._batches
+
+
+if __name__ == "__main__":
+    test_flush_by_batch_size()
+    test_flush_by_timeout()
+    test_exception_propagates_to_every_future()
+    test_engine_without_batching_runs_in_parallel()
+    test_close_cancels_pending_submissions()
+    print("Все тесты BatchedRecognizer пройдены")
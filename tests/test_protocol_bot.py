@@ -0,0 +1,67 @@
+"""
+Модуль для тестирования разбиения длинных ответов бота на сообщения Telegram.
+"""
+
+import os
+import sys
+
+# Модули src импортируют друг друга по имени, поэтому добавляем src в путь
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from protocol_bot import split_message, TELEGRAM_MESSAGE_LIMIT
+
+
+def check_parts(text, parts, limit):
+    """Общие свойства разбиения: лимит длины, нет пустых частей, текст не теряется."""
+    assert all(0 < len(part) <= limit for part in parts)
+    assert all(part.strip("\n") for part in parts)
+    assert "".join(parts).replace("\n", "") == text.replace("\n", "")
+
+
+def test_short_text_is_single_part():
+    """Текст в пределах лимита, в том числе ровно на лимите, не разбивается."""
+    assert split_message("привет", limit=10) == ["привет"]
+    assert split_message("a" * 10, limit=10) == ["a" * 10]
+    assert split_message("a" * TELEGRAM_MESSAGE_LIMIT) == ["a" * TELEGRAM_MESSAGE_LIMIT]
+    assert split_message("") == []
+
+
+def test_text_without_newlines_is_cut_at_limit():
+    """Без переводов строки текст режется ровно по лимиту."""
+    text = "a" * 25
+    parts = split_message(text, limit=10)
+    assert parts == ["a" * 10, "a" * 10, "a" * 5]
+
+
+def test_cut_prefers_newline():
+    """Разрез делается по последнему переводу строки в пределах лимита."""
+    parts = split_message("aaaa\nbbbb\ncccc", limit=10)
+    assert parts == ["aaaa\nbbbb", "cccc"]
+
+    # Перевод строки сразу за лимитом: первая часть занимает лимит целиком
+    assert split_message("a" * 10 + "\n" + "b" * 5, limit=10) == ["a" * 10, "b" * 5]
+
+
+def test_runs_of_newlines_do_not_produce_empty_parts():
+    """Подряд идущие и ведущие переводы строк не дают пустых сообщений."""
+    text = "\n\n\naaaa\n\n\n\n\n\n\n\nbbbb\n\n\n\n\n\n\n\n\n\n\n\ncccc"
+    parts = split_message(text, limit=6)
+    assert parts == ["aaaa", "bbbb", "cccc"]
+    check_parts(text, parts, limit=6)
+
+
+def test_long_protocol_respects_telegram_limit():
+    """Длинный протокол делится на части не длиннее лимита Telegram."""
+    text = "\n".join(f"{i}. Пункт протокола номер {i}" for i in range(1000))
+    parts = split_message(text)
+    assert len(parts) > 1
+    check_parts(text, parts, TELEGRAM_MESSAGE_LIMIT)
+
+
+if __name__ == "__main__":
+    test_short_text_is_single_part()
+    test_text_without_newlines_is_cut_at_limit()
+    test_cut_prefers_newline()
+    test_runs_of_newlines_do_not_produce_empty_parts()
+    test_long_protocol_respects_telegram_limit()
+    print("Все тесты split_message пройдены")
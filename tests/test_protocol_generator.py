@@ -5,6 +5,7 @@
 
 import os
 import sys
+import asyncio
 import logging
 from pathlib import Path
 
@@ -82,5 +83,47 @@ def test_protocol_generation():
     
     logger.info("Тестирование завершено")
 
+
+class EchoProtocolGenerator(ProtocolGenerator):
+    """
+    Генератор, возвращающий расшифровку вместо обращения к Ollama.
+    Первые расшифровки отвечают дольше остальных, чтобы порядок завершения
+    запросов не совпадал с порядком входных данных.
+    """
+    
+    def __init__(self):
+        """Инициализация без подключения к Ollama."""
+    
+    async def _agenerate_one(self, client, semaphore, transcription):
+        index = TEST_TRANSCRIPTIONS.index(transcription)
+        async with semaphore:
+            await asyncio.sleep(0.05 * (len(TEST_TRANSCRIPTIONS) - index))
+        return f"# Протокол {index + 1}\n\n{transcription.strip()}"
+
+
+def test_batch_protocol_generation():
+    """
+    Тестирование пакетной генерации протоколов: результатов столько же,
+    сколько расшифровок, и они идут в порядке входных данных.
+    """
+    test_output_dir = "test_protocols"
+    generator = EchoProtocolGenerator()
+    
+    results = generator.process_voice_transcriptions(
+        TEST_TRANSCRIPTIONS,
+        output_dir=test_output_dir,
+        cache_dir=".protocol_cache"
+    )
+    
+    assert len(results) == len(TEST_TRANSCRIPTIONS)
+    for i, (pdf_path, protocol_text) in enumerate(results):
+        assert protocol_text.startswith(f"# Протокол {i + 1}\n")
+        assert pdf_path is not None and os.path.exists(pdf_path)
+        assert Path(pdf_path).stem.endswith(f"_{i + 1}")
+    
+    logger.info("Тестирование пакетной генерации завершено")
+
+
 if __name__ == "__main__":
     test_protocol_generation()
+    test_batch_protocol_generation()
@@ -4,8 +4,10 @@
 """
 
 import os
+import re
 import sys
 import logging
+from datetime import datetime
 from pathlib import Path
 
 # Добавляем родительскую директорию в путь для импорта модулей
@@ -20,6 +22,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Строки расшифровки длиннее 10 символов, кроме вступительных, становятся вопросами повестки
+_Q_RE = re.compile(r'^[^\S\n]*(?!Сегодня|Провели)(\S.{9,}\S)[^\S\n]*$', re.M)
+_DATE_RE = re.compile(r'\d{1,2}\s+\w+')
+
 # Тестовые расшифровки голосовых сообщений
 TEST_TRANSCRIPTIONS = [
     """
@@ -91,7 +97,6 @@ class MockProtocolGenerator(ProtocolGenerator):
     def __init__(self):
         """Инициализация мок-генератора протоколов."""
         # Не вызываем родительский __init__, чтобы избежать подключения к Ollama
-        self.prompt_template = self._load_prompt_template()
         logger.info("Инициализирован мок-генератор протоколов для тестирования")
     
     def generate_protocol_text(self, transcription):
@@ -106,10 +111,7 @@ class MockProtocolGenerator(ProtocolGenerator):
             str: Структурированный текст протокола
         """
         # Извлекаем дату из текста или используем текущую
-        import re
-        from datetime import datetime
-        
-        date_match = re.search(r'\d{1,2}\s+\w+', transcription)
+        date_match = _DATE_RE.search(transcription)
         if date_match:
             meeting_date = date_match.group(0)
         else:
@@ -130,11 +132,7 @@ class MockProtocolGenerator(ProtocolGenerator):
             responsible = "Заказчик"
         
         # Извлекаем вопросы из текста
-        questions = []
-        for line in transcription.split('\n'):
-            line = line.strip()
-            if line and len(line) > 10 and not line.startswith("Сегодня") and not line.startswith("Провели"):
-                questions.append(f"- {line}")
+        questions = [f"- {line}" for line in _Q_RE.findall(transcription)]
         
         # Формируем решения
         decisions = []